@@ -1,4 +1,7 @@
 import sys
+import re
+import heapq
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 import cv2
 import numpy as np
 import os
@@ -9,9 +12,20 @@ from PyQt5.QtWidgets import (
     QInputDialog  # Added QInputDialog for font size input
 )
 from PyQt5.QtGui import (
-    QPixmap, QImage, QPainter, QPen, QColor, QFont  # Added QFont for setting font size
+    QPixmap, QImage, QImageIOHandler, QImageReader, QPainter, QPen, QColor, QFont, QTransform  # Added QFont for setting font size
 )
-from PyQt5.QtCore import Qt, QPoint, QTimer, pyqtSignal
+from PyQt5.QtCore import Qt, QLine, QPoint, QRectF, QSize, QThread, QTimer, pyqtSignal
+
+# Print progress messages from the annotation save path
+DEBUG = False
+
+# Image files listed for annotation and for resizing, matched on the extension in any case
+IMAGE_FILE_PATTERN = re.compile(r'\.(?:png|jpe?g|bmp|heif)\Z', re.IGNORECASE)
+RESIZE_FILE_PATTERN = re.compile(r'\.(?:png|jpe?g|bmp)\Z', re.IGNORECASE)
+JPEG_FILE_PATTERN = re.compile(r'\.jpe?g\Z', re.IGNORECASE)
+
+# Largest zoomed image, in pixels, kept as a pre-scaled pixmap; larger zooms are scaled while painting
+MAX_SCALED_PIXELS = 4096 * 4096
 
 # List of parts to annotate, including left and right bipod
 parts = [
@@ -39,6 +53,43 @@ rifle_connections = [
     ("front handguard", "barrel")
 ]
 
+# Keypoints of each skeleton type and their default offsets from the image center
+LMG_PARTS = ("butt", "pistol grip", "trigger", "cover", "rear sight",
+             "barrel jacket", "left bipod", "right bipod")
+LMG_OFFSETS = np.array([
+    [-100, 0], [-50, 50], [0, 20], [0, 0], [50, -30],
+    [100, 0], [150, 50], [150, -50]
+], dtype=np.int32)
+
+RIFLE_PARTS = ("butt", "rear sight", "pistol grip", "trigger", "front handguard", "barrel")
+RIFLE_OFFSETS = np.array([
+    [-100, 0], [-50, -30], [-10, 50], [0, 20], [50, 0], [100, 0]
+], dtype=np.int32)
+
+# Keypoint names of each skeleton type and the row of each name in Skeleton.coords
+SKELETON_PARTS = {'LMG': LMG_PARTS, 'Rifle': RIFLE_PARTS}
+PART_INDEX = {skeleton_type: {part: i for i, part in enumerate(skeleton_parts)}
+              for skeleton_type, skeleton_parts in SKELETON_PARTS.items()}
+
+# Skeleton lines of each type as pairs of keypoint indices
+SKELETON_CONNECTIONS = {
+    'LMG': tuple((PART_INDEX['LMG'][part1], PART_INDEX['LMG'][part2]) for part1, part2 in connections),
+    'Rifle': tuple((PART_INDEX['Rifle'][part1], PART_INDEX['Rifle'][part2]) for part1, part2 in rifle_connections)
+}
+
+# YOLO line templates: class index, bounding box, then x and y of every keypoint of the type.
+# Bytes templates format straight to the ASCII written to the label file
+LMG_TEMPLATE = b"%d " + b" ".join([b"%.6f"] * (4 + 2 * len(LMG_PARTS)))
+RIFLE_TEMPLATE = b"%d " + b" ".join([b"%.6f"] * (4 + 2 * len(RIFLE_PARTS)))
+
+# Line template and class index written for each skeleton type. Both types are saved as
+# class 0 so one keypoint model can be trained at a time (see README)
+YOLO_FORMAT_BY_TYPE = {'LMG': (LMG_TEMPLATE, 0), 'Rifle': (RIFLE_TEMPLATE, 0)}
+# Skeleton type created for a label line. Both types share class 0, so a class 0 line with
+# exactly the keypoint values of a Rifle loads as a Rifle; any other class 0 line is an LMG
+SKELETON_TYPE_BY_LINE = {(0, 2 * len(RIFLE_PARTS)): 'Rifle'}
+SKELETON_TYPE_BY_CLASS = {0: 'LMG', 1: 'Rifle'}
+
 class ElidedLabel(QLabel):
     """Custom QLabel that displays elided text with an ellipsis when it exceeds the available width."""
     def __init__(self, text='', parent=None):
@@ -54,88 +105,241 @@ class ElidedLabel(QLabel):
         painter.drawText(self.rect(), self.alignment(), elided_text)
 
 class Skeleton:
-    def __init__(self, default_positions, skeleton_id, skeleton_type):
+    def __init__(self, coords, skeleton_id, skeleton_type, visible=None):
         self.id = skeleton_id
-        self.annotations = default_positions.copy()
+        self.skeleton_type = skeleton_type  # Add skeleton_type to distinguish between LMG and Rifle
+        self.parts = SKELETON_PARTS[skeleton_type]
+        self.part_index = PART_INDEX[skeleton_type]
+        # Keypoint coordinates, one (x, y) row per part, and which keypoints are annotated
+        self.coords = np.array(coords, dtype=np.float64).reshape(len(self.parts), 2)
+        if visible is None:
+            visible = np.ones(len(self.parts), dtype=bool)
+        self.visible = np.array(visible, dtype=bool)
         self.annotation_history = []
         self.redo_stack = []
         self.selected_keypoint = None
-        self.skeleton_type = skeleton_type  # Add skeleton_type to distinguish between LMG and Rifle
+        # Connections for this skeleton type and cached QPoints used for drawing
+        self._conn_cache = SKELETON_CONNECTIONS[skeleton_type]
+        self._qpoint_cache = {}
+        self._edge_cache = None
+
+    def keypoint(self, i):
+        """Return the (x, y) coordinates of keypoint i, or None if it is not annotated."""
+        if not self.visible[i]:
+            return None
+        x, y = self.coords[i].tolist()
+        return x, y
+
+    def set_keypoint(self, i, coords):
+        """Set the coordinates of keypoint i (None removes it) and invalidate its cached drawing points."""
+        if coords is None:
+            self.visible[i] = False
+        else:
+            self.coords[i] = coords
+            self.visible[i] = True
+        self._qpoint_cache.pop(i, None)
+        self._edge_cache = None
+
+    def qpoint(self, i):
+        """Return the cached QPoint of keypoint i, or None if the keypoint is not annotated."""
+        qpoint = self._qpoint_cache.get(i)
+        if qpoint is None:
+            if not self.visible[i]:
+                return None
+            x, y = self.coords[i].tolist()
+            qpoint = self._qpoint_cache[i] = QPoint(int(x), int(y))
+        return qpoint
+
+    def edges(self):
+        """Return the cached QLines of the skeleton between annotated keypoints."""
+        if self._edge_cache is None:
+            visible = self.visible
+            self._edge_cache = [QLine(self.qpoint(i1), self.qpoint(i2))
+                                for i1, i2 in self._conn_cache
+                                if visible[i1] and visible[i2]]
+        return self._edge_cache
+
+class SkeletonStore:
+    """Keypoints of a list of skeletons packed into padded arrays for vectorized processing.
+
+    The store is a snapshot built when it is needed, e.g. on save. The Skeleton objects stay the
+    source of truth because the undo history, copy/paste and the per-image cache hold on to them.
+    """
+    def __init__(self, skeletons):
+        self.types = [skeleton.skeleton_type for skeleton in skeletons]
+        self.num_parts = np.array([len(skeleton.parts) for skeleton in skeletons], dtype=np.intp)
+        max_parts = int(self.num_parts.max(initial=0))
+        # Keypoint coordinates of each skeleton, and which keypoints are annotated; padding is never annotated
+        self.coords = np.zeros((len(skeletons), max_parts, 2), dtype=np.float64)
+        self.mask = np.zeros((len(skeletons), max_parts), dtype=bool)
+        for row, skeleton in enumerate(skeletons):
+            n = self.num_parts[row]
+            self.coords[row, :n] = skeleton.coords
+            self.mask[row, :n] = skeleton.visible
+
+class MoveAction:
+    """Undo record for dragging a keypoint; a whole drag gesture is kept in one record."""
+    __slots__ = ('skeleton', 'part', 'old', 'new')
+
+    def __init__(self, skeleton, part, old, new):
+        self.skeleton = skeleton
+        self.part = part
+        self.old = old
+        self.new = new
 
 class ImageLabel(QLabel):
     point_clicked = pyqtSignal(int, int)
-    keypoint_selected = pyqtSignal(Skeleton, str)
-    keypoint_moved = pyqtSignal(Skeleton, str, int, int)
+    keypoint_selected = pyqtSignal(Skeleton, int)
+    keypoint_moved = pyqtSignal(Skeleton, int, int, int)
 
     def __init__(self, main_window, parent=None):
         super().__init__(parent)
         self.main_window = main_window  # Store reference to the main window
         self.setAlignment(Qt.AlignTop | Qt.AlignLeft)
         self.image = None
+        self.pixmap_base = None  # Unscaled pixmap of the image, scaled by the painter
+        self._scaled_pixmap = None  # pixmap_base scaled to _scaled_zoom, reused while only panning
+        self._scaled_zoom = None
         self.zoom_level = 1.0
         self.offset_x = 0
         self.offset_y = 0
+        self._xform = QTransform()  # Image-to-widget transform for the current zoom and offsets
         self.selected_skeleton = None
         self.selected_keypoint = None
+        self.selected_row = None  # Row of the selected keypoint in the main window's keypoint array
+        self.move_action = None  # Undo record of the current drag
+        # Coalesce drag updates to roughly the display refresh rate
+        self._pending_move = None
+        self._move_timer = QTimer(self)
+        self._move_timer.setSingleShot(True)
+        self._move_timer.setInterval(16)
+        self._move_timer.timeout.connect(self._flush_move)
         self.dragging_keypoint = False
+        self.paint_skeletons = self._paint_multi  # Draws the skeletons, see set_skeleton_count
         self.setFocusPolicy(Qt.StrongFocus)  # To receive key events
 
     def set_image(self, image):
         self.image = image
+        # Largest valid pixel coordinates, used to clamp dragged keypoints
+        self._w1 = image.shape[1] - 1
+        self._h1 = image.shape[0] - 1
+
+    def set_pixmap(self, pixmap):
+        self.pixmap_base = pixmap
+        self._scaled_pixmap = None
+        self._scaled_zoom = None
+        self.updateGeometry()
+
+    def scaled_pixmap(self):
+        # Scale the image once per zoom level so panning and keypoint drags only blit it
+        if self._scaled_zoom != self.zoom_level:
+            self._scaled_zoom = self.zoom_level
+            size = self.sizeHint()
+            if self.zoom_level == 1.0:
+                self._scaled_pixmap = self.pixmap_base
+            elif size.width() * size.height() <= MAX_SCALED_PIXELS:
+                self._scaled_pixmap = self.pixmap_base.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            else:
+                self._scaled_pixmap = None
+        return self._scaled_pixmap
 
     def set_zoom_level(self, zoom_level):
         self.zoom_level = zoom_level
+        self.update_transform()
+        self.updateGeometry()
+
+    def sizeHint(self):
+        # The label is as large as the zoomed image
+        if self.pixmap_base is None:
+            return super().sizeHint()
+        return QSize(int(self.pixmap_base.width() * self.zoom_level),
+                     int(self.pixmap_base.height() * self.zoom_level))
+
+    def minimumSizeHint(self):
+        return self.sizeHint()
 
     def set_offsets(self, offset_x, offset_y):
         self.offset_x = offset_x
         self.offset_y = offset_y
+        self.update_transform()
+
+    def update_transform(self):
+        # Rebuild the cached transform so painting only has to set it
+        self._xform.reset()
+        self._xform.translate(self.offset_x, self.offset_y)
+        self._xform.scale(self.zoom_level, self.zoom_level)
 
     def mousePressEvent(self, event):
         if self.image is not None:
             x_click = (event.x() - self.offset_x) / self.zoom_level
             y_click = (event.y() - self.offset_y) / self.zoom_level
+            self.move_action = None  # A new press starts a new drag gesture
 
             # Check if the click is on a keypoint of any skeleton
-            clicked_on_keypoint = False
-            for skeleton in self.main_window.skeletons:
-                for part, coords in skeleton.annotations.items():
-                    if coords is not None:
-                        x_anno, y_anno = coords
-                        distance = np.hypot(x_click - x_anno, y_click - y_anno)
-                        if distance <= 10:  # 10 pixels tolerance
-                            self.selected_skeleton = skeleton
-                            self.selected_keypoint = part
-                            clicked_on_keypoint = True
-                            self.dragging_keypoint = True
-                            self.keypoint_selected.emit(skeleton, part)
-                            break
-                if clicked_on_keypoint:
-                    break
+            if self.main_window._kp_array is None:
+                self.main_window.update_keypoint_array()
+            kp_array = self.main_window._kp_array
+            if not len(kp_array):
+                return
+            # Squared distances to all keypoints at once (deleted keypoints are NaN)
+            d2 = (kp_array[:, 0] - x_click) ** 2 + (kp_array[:, 1] - y_click) ** 2
+            if np.isnan(d2).all():
+                return
+            idx = np.nanargmin(d2)
+            if d2[idx] <= 100.0:  # 10 pixels tolerance
+                skeleton, i = self.main_window._kp_index[idx]
+                self.selected_skeleton = skeleton
+                self.selected_keypoint = i
+                self.selected_row = idx
+                self.dragging_keypoint = True
+                self.keypoint_selected.emit(skeleton, i)
 
     def mouseMoveEvent(self, event):
-        if self.dragging_keypoint and self.selected_keypoint and self.selected_skeleton:
+        if self.dragging_keypoint and self.selected_keypoint is not None and self.selected_skeleton:
             x_move = (event.x() - self.offset_x) / self.zoom_level
             y_move = (event.y() - self.offset_y) / self.zoom_level
 
             # Ensure coordinates remain within image bounds
-            height, width, _ = self.image.shape
-            x_move = max(0, min(int(x_move), width - 1))
-            y_move = max(0, min(int(y_move), height - 1))
-
-            # Update the position of the selected keypoint
-            old_coords = self.selected_skeleton.annotations[self.selected_keypoint]
-            self.selected_skeleton.annotations[self.selected_keypoint] = (x_move, y_move)
-            self.keypoint_moved.emit(self.selected_skeleton, self.selected_keypoint, x_move, y_move)
-
-            # Record the action for undo
-            self.main_window.annotation_history.append(('move_keypoint', self.selected_skeleton, self.selected_keypoint, old_coords, (x_move, y_move)))
-            self.main_window.redo_stack.clear()
-            self.main_window.annotations_modified = True  # Mark as modified
-            # Update cache
-            self.main_window.annotations_dict[self.main_window.image_file_path] = self.main_window.skeletons.copy()
-            self.update()
+            x_move = int(x_move)
+            x_move = 0 if x_move < 0 else (self._w1 if x_move > self._w1 else x_move)
+            y_move = int(y_move)
+            y_move = 0 if y_move < 0 else (self._h1 if y_move > self._h1 else y_move)
+
+            # Apply the latest position at most once per timer interval
+            self._pending_move = (x_move, y_move)
+            if not self._move_timer.isActive():
+                self._move_timer.start()
+
+    def _flush_move(self):
+        if self._pending_move is None:
+            return
+        x_move, y_move = self._pending_move
+        self._pending_move = None
+
+        # Update the position of the selected keypoint
+        old_coords = self.selected_skeleton.keypoint(self.selected_keypoint)
+        self.selected_skeleton.set_keypoint(self.selected_keypoint, (x_move, y_move))
+        if self.main_window._kp_array is not None:
+            self.main_window._kp_array[self.selected_row] = (x_move, y_move)
+        self.keypoint_moved.emit(self.selected_skeleton, self.selected_keypoint, x_move, y_move)
+
+        # Record the action for undo, updating the record of the current drag in place
+        history = self.main_window.annotation_history
+        if history and history[-1] is self.move_action:
+            self.move_action.new = (x_move, y_move)
+        else:
+            self.move_action = MoveAction(self.selected_skeleton, self.selected_keypoint, old_coords, (x_move, y_move))
+            history.append(self.move_action)
+        self.main_window.redo_stack.clear()
+        self.main_window.annotations_modified = True  # Mark as modified
+        # Update cache
+        self.main_window.annotations_dict[self.main_window.image_file_path] = self.main_window.skeletons.copy()
+        self.update()
 
     def mouseReleaseEvent(self, event):
+        # Apply the final position of the drag right away
+        self._move_timer.stop()
+        self._flush_move()
         self.dragging_keypoint = False
 
     def paintEvent(self, event):
@@ -143,56 +347,82 @@ class ImageLabel(QLabel):
         if self.image is not None:
             painter = QPainter(self)
             painter.setRenderHint(QPainter.Antialiasing)
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            # Draw the image scaled to the zoom level
+            if self.pixmap_base is not None:
+                scaled = self.scaled_pixmap()
+                if scaled is not None:
+                    painter.drawPixmap(0, 0, scaled)
+                else:
+                    source = QRectF(self.pixmap_base.rect())
+                    target = QRectF(0, 0, source.width() * self.zoom_level, source.height() * self.zoom_level)
+                    painter.drawPixmap(target, self.pixmap_base, source)
             # Apply zoom and offsets
-            painter.scale(self.zoom_level, self.zoom_level)
-            painter.translate(self.offset_x / self.zoom_level, self.offset_y / self.zoom_level)
+            painter.setTransform(self._xform)
 
             # Set the font size using the main window's font size
             font = QFont()
             font.setPointSize(self.main_window.font_size)
             painter.setFont(font)
 
-            # Draw all skeletons
-            for skeleton in self.main_window.skeletons:
-                # Draw keypoints
-                for part, coords in skeleton.annotations.items():
-                    pen = QPen(Qt.red, 6)
-                    painter.setPen(pen)
-                    if coords is not None:
-                        x, y = coords
-                        painter.drawEllipse(QPoint(int(x), int(y)), 5, 5)
-
-                        # Set color for text using the selected text color
-                        text_color = self.main_window.text_color
-                        text_pen = QPen(text_color)
-                        painter.setPen(text_pen)
-
-                        # Draw the annotation text
-                        painter.drawText(QPoint(int(x) + 10, int(y) - 10), f"S{ skeleton.id }:{ part }")
-
-                # Draw skeleton lines
-                self.draw_skeleton(painter, skeleton)
-
-    def draw_skeleton(self, painter, skeleton):
-        # Connect the points to form a gun skeleton
-        pen = QPen(Qt.green, 2)
-        painter.setPen(pen)
-        if skeleton.skeleton_type == 'LMG':
-            conn = self.main_window.connections
-        else:
-            conn = self.main_window.rifle_connections
-
-        for part1, part2 in conn:
-            if skeleton.annotations.get(part1) is not None and skeleton.annotations.get(part2) is not None:
-                x1, y1 = skeleton.annotations[part1]
-                x2, y2 = skeleton.annotations[part2]
-                painter.drawLine(QPoint(int(x1), int(y1)), QPoint(int(x2), int(y2)))
+            self.paint_skeletons(painter)
+
+    def _paint_multi(self, painter):
+        # Collect all skeletons' lines, keypoints and labels so each pen is set only once
+        edge_lines = []
+        kp_points = []
+        labels = []
+        for skeleton in self.main_window.skeletons:
+            edge_lines.extend(skeleton.edges())
+            for i, part in enumerate(skeleton.parts):
+                qpoint = skeleton.qpoint(i)
+                if qpoint is not None:
+                    kp_points.append(qpoint)
+                    labels.append((qpoint, f"S{ skeleton.id }:{ part }"))
+
+        # Draw skeleton lines
+        painter.setPen(QPen(Qt.green, 2))
+        painter.drawLines(edge_lines)
+
+        # Draw keypoints
+        painter.setPen(QPen(Qt.red, 6))
+        for qpoint in kp_points:
+            painter.drawEllipse(qpoint, 5, 5)
+
+        # Draw the annotation text using the selected text color
+        painter.setPen(QPen(self.main_window.text_color))
+        for qpoint, text in labels:
+            painter.drawText(qpoint.x() + 10, qpoint.y() - 10, text)
+
+    def _paint_single(self, painter):
+        # Same drawing as _paint_multi for the common case of exactly one skeleton
+        skeleton = self.main_window.skeletons[0]
+        painter.setPen(QPen(Qt.green, 2))
+        painter.drawLines(skeleton.edges())
+
+        visible_parts = np.flatnonzero(skeleton.visible).tolist()
+        painter.setPen(QPen(Qt.red, 6))
+        for i in visible_parts:
+            painter.drawEllipse(skeleton.qpoint(i), 5, 5)
+
+        painter.setPen(QPen(self.main_window.text_color))
+        prefix = f"S{ skeleton.id }:"
+        for i in visible_parts:
+            qpoint = skeleton.qpoint(i)
+            painter.drawText(qpoint.x() + 10, qpoint.y() - 10, prefix + skeleton.parts[i])
+
+    def set_skeleton_count(self, count):
+        # Use the specialised paint path while exactly one skeleton is shown
+        self.paint_skeletons = self._paint_single if count == 1 else self._paint_multi
 
 class KeypointAnnotationTool(QMainWindow):
     def __init__(self):
         super().__init__()
         self.image = None
         self.clone = None
+        self._rgb_buf = None  # RGB copy of the image backing _base_qimage
+        self._base_qimage = None  # QImage wrapping _rgb_buf for the lifetime of the image
+        self._base_pixmap = None  # Pixmap uploaded once per image, scaled when painting
         self.zoom_level = 1.0  # Initialize zoom level
         self.dragging = False
         self.last_drag_pos = QPoint()
@@ -201,12 +431,15 @@ class KeypointAnnotationTool(QMainWindow):
         self.save_folder = None  # Folder to save annotations
         self.auto_save = False  # Auto-save toggle
         self.skeletons = []  # List of Skeleton instances
-        self.deleted_skeleton_ids = set()  # Track deleted skeleton IDs to reuse them
+        self._free_ids = []  # Min-heap of released skeleton IDs to reuse
+        self._next_id = 1  # Next never-used skeleton ID
         self.annotation_history = []  # Global history for undo/redo
         self.redo_stack = []
         self.selected_skeleton = None
         self.selected_keypoint = None
         self.image_file_paths = []  # List of image file paths
+        self.image_file_path = None  # Path of the current image
+        self._label_file_path = None  # Annotation file of the current image in the save folder
         self.current_image_index = -1  # Index of the current image
         self.current_skeleton_type = 'LMG'  # Default skeleton type
         self.copied_annotations = None  # For copy/paste functionality
@@ -215,10 +448,37 @@ class KeypointAnnotationTool(QMainWindow):
 
         self.annotations_modified = False  # Track if annotations have been modified
         self.annotations_dict = {}  # Cache for annotations
-
-        # Make connections accessible to ImageLabel
-        self.connections = connections
-        self.rifle_connections = rifle_connections
+        self._kp_array = None  # Keypoint coordinates for hit-testing, rebuilt lazily when None
+        self._kp_index = []  # (skeleton, part) for each row of _kp_array
+        # Redraws for panning and zooming are throttled to one per display frame
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True)
+        self._redraw_timer.setInterval(16)
+        self._redraw_timer.timeout.connect(self.display_image)
+
+        # Keyboard shortcuts as (key, modifiers) -> handler; Delete is handled separately
+        # in keyPressEvent since it works with any modifiers
+        control_shift = int(Qt.ControlModifier | Qt.ShiftModifier)
+        self._key_handlers = {
+            (Qt.Key_A, 0): self.load_previous_image,  # 'A' key for previous image
+            (Qt.Key_D, 0): self.load_next_image,  # 'D' key for next image
+            (Qt.Key_R, 0): self.reset_annotations,  # 'R' key for reset
+            (Qt.Key_1, 0): lambda: self.set_skeleton_type('LMG'),  # '1' key for LMG Skeleton
+            (Qt.Key_2, 0): lambda: self.set_skeleton_type('Rifle'),  # '2' key for Rifle Skeleton
+            (Qt.Key_Z, int(Qt.ControlModifier)): self.undo_action,  # Ctrl + 'Z' for undo
+            (Qt.Key_Y, int(Qt.ControlModifier)): self.redo_action,  # Ctrl + 'Y' for redo
+            (Qt.Key_S, int(Qt.ControlModifier)): self.save_annotations,  # Ctrl + 'S' for save annotations
+            (Qt.Key_I, control_shift): self.select_image_folder,  # Ctrl + Shift + 'I' for select image folder
+            (Qt.Key_S, control_shift): self.select_save_folder,  # Ctrl + Shift + 'S' for select save folder
+            (Qt.Key_A, int(Qt.ControlModifier)): self.toggle_auto_save_shortcut,  # Ctrl + 'A' for auto save
+            (Qt.Key_Period, 0): self.show_keyboard_shortcuts,  # '.' key to open keyboard shortcuts
+            (Qt.Key_E, int(Qt.ControlModifier)): self.open_extract_frames_dialog,  # Ctrl + 'E' for extract frames
+            (Qt.Key_R, control_shift): self.open_resize_dialog,  # Ctrl + Shift + 'R' for resize images
+            (Qt.Key_C, control_shift): self.open_color_picker,  # Ctrl + Shift + 'C' for changing text color
+            (Qt.Key_C, int(Qt.ControlModifier)): self.copy_annotations,  # Ctrl + 'C' for copying annotations
+            (Qt.Key_V, int(Qt.ControlModifier)): self.paste_annotations,  # Ctrl + 'V' for pasting annotations
+            (Qt.Key_F, int(Qt.ControlModifier)): self.open_font_size_dialog,  # Ctrl + 'F' for changing font size
+        }
 
         self.initUI()
 
@@ -396,11 +656,10 @@ class KeypointAnnotationTool(QMainWindow):
             self.image_folder_label.setToolTip(self.image_folder_label.text())
 
             # Get list of image files in the folder
-            supported_formats = ('.png', '.jpg', '.jpeg', '.bmp', '.heif')
-            self.image_file_paths = [os.path.join(self.image_folder_path, f)
-                                     for f in os.listdir(self.image_folder_path)
-                                     if f.lower().endswith(supported_formats)]
-            self.image_file_paths.sort()  # Sort the file list
+            with os.scandir(self.image_folder_path) as entries:
+                self.image_file_paths = sorted(  # Sort the file list
+                    entry.path for entry in entries
+                    if IMAGE_FILE_PATTERN.search(entry.name) and entry.is_file())
 
             if self.image_file_paths:
                 self.current_image_index = 0
@@ -414,13 +673,24 @@ class KeypointAnnotationTool(QMainWindow):
     def load_image(self):
         if 0 <= self.current_image_index < len(self.image_file_paths):
             self.image_file_path = self.image_file_paths[self.current_image_index]
+            self.update_label_file_path()
             self.image = cv2.imread(self.image_file_path)
-            self.clone = self.image.copy()
+            self.clone = self.image  # The image is only read, so share the buffer instead of copying it
             self.zoom_level = 1.0  # Reset zoom when a new image is loaded
             self.offset_x = 0
             self.offset_y = 0
             self.annotation_history = []
             self.redo_stack = []
+            # Upload the image once; zooming only changes the painter's scale.
+            # Convert to RGB once so Qt gets its native byte order; QImage does not
+            # own its data, so keep the buffer alive alongside it.
+            self._rgb_buf = np.empty_like(self.clone)
+            cv2.cvtColor(self.clone, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+            height, width, channels = self._rgb_buf.shape
+            self._base_qimage = QImage(self._rgb_buf.data, width, height,
+                                       channels * width, QImage.Format_RGB888)
+            self._base_pixmap = QPixmap.fromImage(self._base_qimage)
+            self.image_label.set_pixmap(self._base_pixmap)
             self.display_image()
             self.image_label.set_image(self.clone)
             self.image_label.set_zoom_level(self.zoom_level)
@@ -431,13 +701,15 @@ class KeypointAnnotationTool(QMainWindow):
             # Retrieve annotations from cache
             if self.image_file_path in self.annotations_dict:
                 self.skeletons = self.annotations_dict[self.image_file_path]
+                self.reset_skeleton_ids()
                 self.image_label.update()
             else:
                 self.skeletons = []
-                self.deleted_skeleton_ids = set()
+                self.reset_skeleton_ids()
                 # Load existing annotations from file if they exist
                 if self.save_folder:
                     self.load_annotations()
+            self.skeletons_changed()
             self.annotations_modified = False  # Reset the modified flag
         else:
             self.show_toast("No images to load.")
@@ -493,25 +765,10 @@ class KeypointAnnotationTool(QMainWindow):
             center_x = width // 2
             center_y = height // 2
             if self.current_skeleton_type == 'LMG':
-                default_positions = {
-                    "butt": (center_x - 100, center_y),
-                    "pistol grip": (center_x - 50, center_y + 50),
-                    "trigger": (center_x, center_y + 20),
-                    "cover": (center_x, center_y),
-                    "rear sight": (center_x + 50, center_y - 30),
-                    "barrel jacket": (center_x + 100, center_y),
-                    "left bipod": (center_x + 150, center_y + 50),
-                    "right bipod": (center_x + 150, center_y - 50)
-                }
+                offsets = LMG_OFFSETS
             else:  # Rifle skeleton
-                default_positions = {
-                    "butt": (center_x - 100, center_y),
-                    "rear sight": (center_x - 50, center_y - 30),
-                    "pistol grip": (center_x - 10, center_y + 50),
-                    "trigger": (center_x, center_y + 20),
-                    "front handguard": (center_x + 50, center_y),
-                    "barrel": (center_x + 100, center_y)
-                }
+                offsets = RIFLE_OFFSETS
+            default_positions = offsets + (center_x, center_y)
 
             # Pass the skeleton_type to the Skeleton constructor
             skeleton = Skeleton(default_positions, skeleton_id, self.current_skeleton_type)
@@ -524,47 +781,60 @@ class KeypointAnnotationTool(QMainWindow):
             self.annotations_modified = True  # Mark as modified
             # Update cache
             self.annotations_dict[self.image_file_path] = self.skeletons.copy()
+            self.skeletons_changed()
             # Update display
             self.image_label.update()
         else:
             self.show_toast("Please load an image first.")
 
+    def skeletons_changed(self):
+        # Skeletons were added, removed or edited; the keypoint array is rebuilt on the next click
+        self._kp_array = None
+        self.image_label.set_skeleton_count(len(self.skeletons))
+
+    def update_keypoint_array(self):
+        """Rebuild the keypoint coordinate array used for hit-testing from the current skeletons."""
+        self._kp_index = [(skeleton, i) for skeleton in self.skeletons for i in range(len(skeleton.parts))]
+        if self.skeletons:
+            self._kp_array = np.concatenate([
+                np.where(skeleton.visible[:, None], skeleton.coords, np.nan) for skeleton in self.skeletons
+            ]).astype(np.float32)
+        else:
+            self._kp_array = np.empty((0, 2), dtype=np.float32)
+
     def get_next_skeleton_id(self):
-        # Reuse deleted skeleton IDs or increment if no deleted IDs
-        existing_ids = {skeleton.id for skeleton in self.skeletons}
-        all_ids = set(range(1, len(self.skeletons) + len(self.deleted_skeleton_ids) + 2))
-        available_ids = all_ids - existing_ids
-        return min(available_ids)
+        # Reuse the smallest released skeleton ID or take a new one
+        if self._free_ids:
+            return heapq.heappop(self._free_ids)
+        skeleton_id = self._next_id
+        self._next_id += 1
+        return skeleton_id
+
+    def release_skeleton_id(self, skeleton_id):
+        # Make the ID of a removed skeleton available for reuse
+        heapq.heappush(self._free_ids, skeleton_id)
+
+    def reset_skeleton_ids(self):
+        """Rebuild the skeleton ID allocator from the IDs of the current skeletons."""
+        used_ids = {skeleton.id for skeleton in self.skeletons}
+        self._next_id = max(used_ids, default=0) + 1
+        # An ascending list is already a valid heap
+        self._free_ids = [i for i in range(1, self._next_id) if i not in used_ids]
 
     def display_image(self):
         if self.image is not None:
-            height, width, channels = self.image.shape
-
-            # Apply the zoom level to the image size
-            zoomed_width = int(width * self.zoom_level)
-            zoomed_height = int(height * self.zoom_level)
-
-            # Resize the image based on zoom level
-            resized_image = cv2.resize(
-                self.image, (zoomed_width, zoomed_height), interpolation=cv2.INTER_AREA)
-            bytes_per_line = channels * zoomed_width
-            q_image = QImage(resized_image.data, zoomed_width, zoomed_height,
-                             bytes_per_line, QImage.Format_BGR888)
-            pixmap = QPixmap.fromImage(q_image)
-            self.image_label.setPixmap(pixmap)
-            self.image_label.adjustSize()  # Ensure the label resizes to the pixmap size
-
-            # Update image label properties
+            # Update image label properties; the label scales the pixmap when painting
             self.image_label.set_zoom_level(self.zoom_level)
             self.image_label.set_offsets(self.offset_x, self.offset_y)
+            self.image_label.adjustSize()  # Ensure the label resizes to the zoomed image
 
             # Adjust the scroll area based on zoom and drag offsets
             self.image_label.move(self.offset_x, self.offset_y)
             self.image_label.update()
 
-    def keypoint_selected(self, skeleton, part):
+    def keypoint_selected(self, skeleton, i):
         self.selected_skeleton = skeleton
-        self.selected_keypoint = part
+        self.selected_keypoint = i
 
     def reset_annotations(self):
         if self.image is None:
@@ -577,7 +847,7 @@ class KeypointAnnotationTool(QMainWindow):
         self.redo_stack.clear()
         # Reset annotations
         self.skeletons = []
-        self.deleted_skeleton_ids = set()
+        self.reset_skeleton_ids()
         self.selected_skeleton = None
         self.selected_keypoint = None
 
@@ -585,15 +855,16 @@ class KeypointAnnotationTool(QMainWindow):
         self.annotations_dict[self.image_file_path] = self.skeletons.copy()
 
         # Delete the annotation file if it exists
-        if self.save_folder:
-            image_name = os.path.basename(self.image_file_path)
-            base_name = os.path.splitext(image_name)[0]
-            label_file_path = os.path.join(self.save_folder, f"{base_name}.txt")
-            if os.path.exists(label_file_path):
-                os.remove(label_file_path)
-                print(f"Annotation file {label_file_path} deleted due to reset.")
+        if self._label_file_path:
+            try:
+                os.unlink(self._label_file_path)
+            except FileNotFoundError:
+                pass
+            else:
+                print(f"Annotation file {self._label_file_path} deleted due to reset.")
 
         self.annotations_modified = True  # Mark annotations as modified
+        self.skeletons_changed()
         self.image_label.update()
 
     def undo_action(self):
@@ -604,24 +875,24 @@ class KeypointAnnotationTool(QMainWindow):
         if self.annotation_history:
             action = self.annotation_history.pop()
             self.redo_stack.append(action)
-            action_type = action[0]
+            action_type = 'move_keypoint' if isinstance(action, MoveAction) else action[0]
 
             if action_type == 'add_skeleton':
                 skeleton = action[1]
                 self.skeletons.remove(skeleton)
-                self.deleted_skeleton_ids.add(skeleton.id)
+                self.release_skeleton_id(skeleton.id)
             elif action_type == 'move_keypoint':
-                skeleton, part, old_coords, new_coords = action[1], action[2], action[3], action[4]
-                skeleton.annotations[part] = old_coords
+                action.skeleton.set_keypoint(action.part, action.old)
             elif action_type == 'delete_keypoint':
                 skeleton, part, coords = action[1], action[2], action[3]
-                skeleton.annotations[part] = coords
+                skeleton.set_keypoint(part, coords)
             elif action_type == 'reset':
                 self.skeletons = action[1]
-                self.deleted_skeleton_ids = set()
+                self.reset_skeleton_ids()
             self.annotations_modified = True  # Mark as modified
             # Update cache
             self.annotations_dict[self.image_file_path] = self.skeletons.copy()
+            self.skeletons_changed()
             self.image_label.update()
         else:
             self.show_toast("No actions to undo.")
@@ -634,24 +905,24 @@ class KeypointAnnotationTool(QMainWindow):
         if self.redo_stack:
             action = self.redo_stack.pop()
             self.annotation_history.append(action)
-            action_type = action[0]
+            action_type = 'move_keypoint' if isinstance(action, MoveAction) else action[0]
 
             if action_type == 'add_skeleton':
                 skeleton = action[1]
                 self.skeletons.append(skeleton)
-                self.deleted_skeleton_ids.discard(skeleton.id)
+                self.reset_skeleton_ids()  # Take the skeleton's ID back out of the free list
             elif action_type == 'move_keypoint':
-                skeleton, part, old_coords, new_coords = action[1], action[2], action[3], action[4]
-                skeleton.annotations[part] = new_coords
+                action.skeleton.set_keypoint(action.part, action.new)
             elif action_type == 'delete_keypoint':
                 skeleton, part, coords = action[1], action[2], action[3]
-                skeleton.annotations[part] = None
+                skeleton.set_keypoint(part, None)
             elif action_type == 'reset':
                 self.skeletons = []
-                self.deleted_skeleton_ids = set()
+                self.reset_skeleton_ids()
             self.annotations_modified = True  # Mark as modified
             # Update cache
             self.annotations_dict[self.image_file_path] = self.skeletons.copy()
+            self.skeletons_changed()
             self.image_label.update()
         else:
             self.show_toast("No actions to redo.")
@@ -666,6 +937,15 @@ class KeypointAnnotationTool(QMainWindow):
         else:
             self.folder_label.setText("No save folder selected")
             self.folder_label.setToolTip(self.folder_label.text())
+        self.update_label_file_path()
+
+    def update_label_file_path(self):
+        # Cache the path of the current image's annotation file in the save folder
+        if self.save_folder and self.image_file_path:
+            base_name = os.path.splitext(os.path.basename(self.image_file_path))[0]
+            self._label_file_path = os.path.join(self.save_folder, f"{base_name}.txt")
+        else:
+            self._label_file_path = None
 
     def toggle_auto_save(self, state):
         # Toggle auto-save functionality
@@ -720,14 +1000,16 @@ class KeypointAnnotationTool(QMainWindow):
         if self.image is not None and self.save_folder:
             if not self.skeletons:
                 # Do not save if there are no annotations
-                print("No annotations to save.")
+                if DEBUG:
+                    print("No annotations to save.")
                 # Remove existing annotation file if it exists
-                image_name = os.path.basename(self.image_file_path)
-                base_name = os.path.splitext(image_name)[0]
-                label_file_path = os.path.join(self.save_folder, f"{base_name}.txt")
-                if os.path.exists(label_file_path):
-                    os.remove(label_file_path)
-                    print(f"Removed existing annotation file {label_file_path} due to no annotations.")
+                try:
+                    os.unlink(self._label_file_path)
+                except FileNotFoundError:
+                    pass
+                else:
+                    if DEBUG:
+                        print(f"Removed existing annotation file {self._label_file_path} due to no annotations.")
                 self.annotations_modified = False  # Reset the modified flag
                 return
 
@@ -738,7 +1020,8 @@ class KeypointAnnotationTool(QMainWindow):
             image_name = os.path.basename(self.image_file_path)
             save_yolo_format(
                 self.save_folder, image_name, self.skeletons,
-                self.image.shape[1], self.image.shape[0]
+                self.image.shape[1], self.image.shape[0],
+                label_file_path=self._label_file_path
             )
             self.show_toast("Annotations saved.")
             self.annotations_modified = False  # Reset the modified flag
@@ -749,53 +1032,39 @@ class KeypointAnnotationTool(QMainWindow):
         # Load annotations from a file if it exists
         if not self.save_folder:
             return
-        image_name = os.path.basename(self.image_file_path)
-        base_name = os.path.splitext(image_name)[0]
-        label_file_path = os.path.join(self.save_folder, f"{base_name}.txt")
+        label_file_path = self._label_file_path
         if os.path.exists(label_file_path):
             with open(label_file_path, 'r') as label_file:
                 lines = label_file.readlines()
                 self.skeletons = []  # Clear existing skeletons
+                self.reset_skeleton_ids()
+                # Image size as (width, height) to denormalize keypoints with, read once per file
+                h, w = self.image.shape[:2]
+                scale = np.array([w, h], dtype=np.float64)
                 for line in lines:
-                    # Parse each line according to YOLO format
-                    parts = line.strip().split()
-                    if len(parts) < 5:
+                    # Parse each line according to YOLO format, converting all values in one call
+                    values = np.array(line.split(), dtype=np.float64)
+                    if len(values) < 5:
                         continue  # Invalid line
-                    class_index = int(parts[0])
-                    bbox_center_x = float(parts[1])
-                    bbox_center_y = float(parts[2])
-                    bbox_width = float(parts[3])
-                    bbox_height = float(parts[4])
-                    keypoints = parts[5:]
+                    class_index = int(values[0])
+                    keypoints = values[5:]  # The bounding box (values 1-4) is recomputed on save
                     # Create skeleton based on class_index
-                    if class_index == 0:
-                        skeleton_type = 'LMG'
-                        skeleton_parts = ["butt", "pistol grip", "trigger", "cover", "rear sight",
-                                        "barrel jacket", "left bipod", "right bipod"]
-                    elif class_index == 1:
-                        skeleton_type = 'Rifle'
-                        skeleton_parts = ["butt", "rear sight", "pistol grip", "trigger", "front handguard", "barrel"]
-                    else:
+                    skeleton_type = SKELETON_TYPE_BY_LINE.get((class_index, len(keypoints)),
+                                                              SKELETON_TYPE_BY_CLASS.get(class_index))
+                    if skeleton_type is None:
                         continue  # Unknown class index, skip
-                    # Initialize annotations
-                    annotations = {}
-                    num_keypoints = len(skeleton_parts)
-                    for i in range(num_keypoints):
-                        idx = i * 2  # Two values per keypoint (x, y)
-                        if idx + 1 < len(keypoints):
-                            x_str, y_str = keypoints[idx], keypoints[idx + 1]
-                            x = float(x_str)
-                            y = float(y_str)
-                            if x >= 0 and y >= 0:
-                                # Denormalize coordinates
-                                x *= self.image.shape[1]
-                                y *= self.image.shape[0]
-                                annotations[skeleton_parts[i]] = (x, y)
-                            else:
-                                annotations[skeleton_parts[i]] = None
+                    # Pair up the keypoint values; keypoints missing from the line stay unannotated
+                    # and a trailing unpaired value is ignored
+                    num_keypoints = len(SKELETON_PARTS[skeleton_type])
+                    num_pairs = min(num_keypoints, len(keypoints) // 2)
+                    normalized = np.full((num_keypoints, 2), -1.0)
+                    normalized[:num_pairs] = keypoints[:2 * num_pairs].reshape(-1, 2)
+                    visible = (normalized >= 0).all(axis=1)
+                    # Denormalize coordinates; unannotated keypoints are zeroed
+                    coords = np.where(visible[:, None], normalized * scale, 0.0)
                     # Create Skeleton instance
                     skeleton_id = self.get_next_skeleton_id()
-                    skeleton = Skeleton(annotations, skeleton_id, skeleton_type)
+                    skeleton = Skeleton(coords, skeleton_id, skeleton_type, visible)
                     self.skeletons.append(skeleton)
                 self.image_label.update()
 
@@ -811,7 +1080,12 @@ class KeypointAnnotationTool(QMainWindow):
         self.zoom_label.setText(f'Zoom: {zoom_percentage}%')
 
         # Update the display with the new zoom level
-        self.display_image()
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        # Redraw at most once per timer interval; the timeout shows the latest zoom and offsets
+        if not self._redraw_timer.isActive():
+            self._redraw_timer.start()
 
     def mousePressEvent(self, event):
         # Handle drag start
@@ -826,7 +1100,7 @@ class KeypointAnnotationTool(QMainWindow):
             self.offset_x += delta.x()
             self.offset_y += delta.y()
             self.last_drag_pos = event.pos()
-            self.display_image()
+            self.schedule_redraw()
 
     def mouseReleaseEvent(self, event):
         # End dragging
@@ -834,97 +1108,38 @@ class KeypointAnnotationTool(QMainWindow):
 
     def keyPressEvent(self, event):
         key = event.key()
-        modifiers = event.modifiers()
 
         if key == Qt.Key_Delete:
-            if self.selected_skeleton and self.selected_keypoint:
-                # Delete the selected keypoint
-                coords = self.selected_skeleton.annotations[self.selected_keypoint]
-                self.selected_skeleton.annotations[self.selected_keypoint] = None
-                print(f"Keypoint '{self.selected_keypoint}' deleted from Skeleton {self.selected_skeleton.id}.")
-                # Record the action for undo
-                self.annotation_history.append(('delete_keypoint', self.selected_skeleton, self.selected_keypoint, coords))
-                # Clear redo stack
-                self.redo_stack.clear()
-                self.selected_keypoint = None
-                self.annotations_modified = True  # Mark as modified
-                # Update cache
-                self.annotations_dict[self.image_file_path] = self.skeletons.copy()
-                self.image_label.update()
-
-        elif key == Qt.Key_A and not modifiers:
-            # 'A' key for previous image
-            self.load_previous_image()
-
-        elif key == Qt.Key_D and not modifiers:
-            # 'D' key for next image
-            self.load_next_image()
-
-        elif key == Qt.Key_R and not modifiers:
-            # 'R' key for reset
-            self.reset_annotations()
-
-        elif key == Qt.Key_1 and not modifiers:
-            # '1' key for LMG Skeleton
-            self.set_skeleton_type('LMG')
-
-        elif key == Qt.Key_2 and not modifiers:
-            # '2' key for Rifle Skeleton
-            self.set_skeleton_type('Rifle')
-
-        elif key == Qt.Key_Z and modifiers == Qt.ControlModifier:
-            # Ctrl + 'Z' for undo
-            self.undo_action()
-
-        elif key == Qt.Key_Y and modifiers == Qt.ControlModifier:
-            # Ctrl + 'Y' for redo
-            self.redo_action()
-
-        elif key == Qt.Key_S and modifiers == Qt.ControlModifier:
-            # Ctrl + 'S' for save annotations
-            self.save_annotations()
-
-        elif key == Qt.Key_I and modifiers == (Qt.ControlModifier | Qt.ShiftModifier):
-            # Ctrl + Shift + 'I' for select image folder
-            self.select_image_folder()
-
-        elif key == Qt.Key_S and modifiers == (Qt.ControlModifier | Qt.ShiftModifier):
-            # Ctrl + Shift + 'S' for select save folder
-            self.select_save_folder()
-
-        elif key == Qt.Key_A and modifiers == Qt.ControlModifier:
-            # Ctrl + 'A' for enabling/disabling auto save annotations
-            current_state = self.auto_save_checkbox.isChecked()
-            self.auto_save_checkbox.setChecked(not current_state)
-            self.toggle_auto_save(Qt.Checked if not current_state else Qt.Unchecked)
-
-        elif key == Qt.Key_Period and not modifiers:
-            # '.' key to open keyboard shortcuts
-            self.show_keyboard_shortcuts()
-
-        elif key == Qt.Key_E and modifiers == Qt.ControlModifier:
-            # Ctrl + 'E' for extract frames
-            self.open_extract_frames_dialog()
-
-        elif key == Qt.Key_R and modifiers == (Qt.ControlModifier | Qt.ShiftModifier):
-            # Ctrl + Shift + 'R' for resize images
-            self.open_resize_dialog()
-
-        elif key == Qt.Key_C and modifiers == (Qt.ControlModifier | Qt.ShiftModifier):
-            # Ctrl + Shift + 'C' for changing text color
-            self.open_color_picker()
+            self.delete_selected_keypoint()
+            return
 
-        elif key == Qt.Key_C and modifiers == Qt.ControlModifier:
-            # Ctrl + 'C' for copying annotations
-            self.copy_annotations()
+        handler = self._key_handlers.get((key, int(event.modifiers())))
+        if handler is not None:
+            handler()
+
+    def delete_selected_keypoint(self):
+        if self.selected_skeleton and self.selected_keypoint is not None:
+            # Delete the selected keypoint
+            coords = self.selected_skeleton.keypoint(self.selected_keypoint)
+            self.selected_skeleton.set_keypoint(self.selected_keypoint, None)
+            part = self.selected_skeleton.parts[self.selected_keypoint]
+            print(f"Keypoint '{part}' deleted from Skeleton {self.selected_skeleton.id}.")
+            # Record the action for undo
+            self.annotation_history.append(('delete_keypoint', self.selected_skeleton, self.selected_keypoint, coords))
+            # Clear redo stack
+            self.redo_stack.clear()
+            self.selected_keypoint = None
+            self.annotations_modified = True  # Mark as modified
+            # Update cache
+            self.annotations_dict[self.image_file_path] = self.skeletons.copy()
+            self.skeletons_changed()
+            self.image_label.update()
 
-        elif key == Qt.Key_V and modifiers == Qt.ControlModifier:
-            # Ctrl + 'V' for pasting annotations
-            self.paste_annotations()
-        
-        elif key == Qt.Key_F and modifiers == Qt.ControlModifier:
-            # Ctrl + 'F' for changing font size
-            self.open_font_size_dialog()
+    def toggle_auto_save_shortcut(self):
+        # Flip the auto save checkbox and apply the new state
+        current_state = self.auto_save_checkbox.isChecked()
+        self.auto_save_checkbox.setChecked(not current_state)
+        self.toggle_auto_save(Qt.Checked if not current_state else Qt.Unchecked)
 
     def copy_annotations(self):
         if self.image is None:
@@ -957,12 +1172,13 @@ class KeypointAnnotationTool(QMainWindow):
             self.annotations_modified = True  # Mark as modified
             # Update cache
             self.annotations_dict[self.image_file_path] = self.skeletons.copy()
+            self.skeletons_changed()
             self.image_label.update()
             self.show_toast("Annotations pasted.")
         else:
             self.show_toast("No annotations to paste.")
 
-def save_yolo_format(save_folder, image_name, skeletons, image_width, image_height):
+def save_yolo_format(save_folder, image_name, skeletons, image_width, image_height, label_file_path=None):
     """
     Save annotations in YOLO format for pose estimation.
     Args:
@@ -971,80 +1187,132 @@ def save_yolo_format(save_folder, image_name, skeletons, image_width, image_heig
     - skeletons: List of skeletons with keypoint annotations.
     - image_width: The width of the image.
     - image_height: The height of the image.
+    - label_file_path: Path of the .txt file to write, if the caller already has it.
     """
     # Create the path for the corresponding .txt file
-    base_name = os.path.splitext(image_name)[0]
-    label_file_path = os.path.join(save_folder, f"{base_name}.txt")
+    if label_file_path is None:
+        base_name = os.path.splitext(image_name)[0]
+        label_file_path = os.path.join(save_folder, f"{base_name}.txt")
 
     # List to store the YOLO format data for each object
     yolo_data = []
 
-    # Loop through all skeletons
-    for skeleton in skeletons:
-        # Initialize variables for bounding box
-        keypoints = []
-        xs = []
-        ys = []
-
-        # Always assign class index 0 for all skeletons (both LMG and Rifle)
-        class_index = 0
-
-        # Define the skeleton parts based on the type
-        if skeleton.skeleton_type == 'LMG':
-            skeleton_parts = ["butt", "pistol grip", "trigger", "cover", "rear sight",
-                              "barrel jacket", "left bipod", "right bipod"]
-        else:  # Rifle skeleton
-            skeleton_parts = ["butt", "rear sight", "pistol grip", "trigger", "front handguard", "barrel"]
-
-        # Process keypoints for each skeleton
-        for part in skeleton_parts:
-            coords = skeleton.annotations.get(part)
-            if coords is not None:
-                x, y = coords
-
-                # Normalize the keypoint coordinates
-                normalized_x = x / image_width
-                normalized_y = y / image_height
-
-                # Collect coordinates for bounding box calculation
-                xs.append(normalized_x)
-                ys.append(normalized_y)
-
-                # Append normalized keypoints to list
-                keypoints.extend([f"{normalized_x:.6f}", f"{normalized_y:.6f}"])
-
-        # If there are valid keypoints, calculate bounding box
-        if xs and ys:
-            min_x = min(xs)
-            max_x = max(xs)
-            min_y = min(ys)
-            max_y = max(ys)
-
-            # Calculate bounding box center and size
-            bbox_center_x = (min_x + max_x) / 2
-            bbox_center_y = (min_y + max_y) / 2
-            bbox_width = max_x - min_x
-            bbox_height = max_y - min_y
-
-            # Format: <class-index> <x> <y> <width> <height> <px1> <py1> ... <pxn> <pyn>
-            yolo_format_line = f"{class_index} {bbox_center_x:.6f} {bbox_center_y:.6f} " \
-                               f"{bbox_width:.6f} {bbox_height:.6f} " + " ".join(keypoints)
-
-            # Append the object information in YOLO format
-            yolo_data.append(yolo_format_line)
+    # Normalize the keypoints of all skeletons at once; the reciprocal of the image size
+    # makes that a single multiplication. Only skeletons with annotated keypoints are saved
+    store = SkeletonStore([skeleton for skeleton in skeletons if skeleton.visible.any()])
+    inv_size = np.array([1.0 / image_width, 1.0 / image_height])
+    normalized = store.coords * inv_size
+    mask = store.mask[:, :, None]
+
+    # Bounding box of the annotated keypoints of every skeleton
+    mins = np.where(mask, normalized, np.inf).min(axis=1, initial=np.inf)
+    maxs = np.where(mask, normalized, -np.inf).max(axis=1, initial=-np.inf)
+    centers = (mins + maxs) * 0.5
+    sizes = maxs - mins
+
+    # Unannotated keypoints are written as -1 so the remaining keypoints keep their position
+    keypoints = np.where(mask, normalized, -1.0)
+
+    for row, skeleton_type in enumerate(store.types):
+        # Line template and class index of the skeleton type (class 0 for both LMG and Rifle)
+        template, class_index = YOLO_FORMAT_BY_TYPE[skeleton_type]
+        bbox_center_x, bbox_center_y = centers[row].tolist()
+        bbox_width, bbox_height = sizes[row].tolist()
+
+        # Format: <class-index> <x> <y> <width> <height> <px1> <py1> ... <pxn> <pyn>
+        yolo_format_line = template % (class_index, bbox_center_x, bbox_center_y,
+                                       bbox_width, bbox_height,
+                                       *keypoints[row, :store.num_parts[row]].ravel().tolist())
+
+        # Append the object information in YOLO format
+        yolo_data.append(yolo_format_line)
 
     # If there is data to save, write to file
     if yolo_data:
-        with open(label_file_path, 'w') as label_file:
-            label_file.write("\n".join(yolo_data))
-        print(f"Annotations saved to {label_file_path}.")
+        # Write the whole file in one call to a temporary file, then swap it in so that
+        # fast navigation never leaves a half-written label file behind
+        tmp_file_path = label_file_path + ".tmp"
+        with open(tmp_file_path, 'wb', buffering=1 << 16) as label_file:
+            label_file.write(b"\n".join(yolo_data))
+        os.replace(tmp_file_path, label_file_path)
+        if DEBUG:
+            print(f"Annotations saved to {label_file_path}.")
     else:
         # Do not save an empty file
-        print(f"No annotations to save for {image_name}.")
+        if DEBUG:
+            print(f"No annotations to save for {image_name}.")
         # Optional: Remove existing annotation file if it exists
-        if os.path.exists(label_file_path):
-            os.remove(label_file_path)
-            print(f"Removed existing annotation file {label_file_path} due to no annotations.")
+        try:
+            os.unlink(label_file_path)
+        except FileNotFoundError:
+            pass
+        else:
+            if DEBUG:
+                print(f"Removed existing annotation file {label_file_path} due to no annotations.")
+
+class ExtractWorker(QThread):
+    """Extracts frames from a video off the GUI thread and reports progress through signals."""
+    total = pyqtSignal(int)  # Number of frames in the video
+    progress = pyqtSignal(int)  # Number of frames read so far
+    finished_count = pyqtSignal(int)  # Number of frames saved
+
+    seek_interval = 30  # Shortest frame interval that is skipped by seeking instead of grabbing
+
+    def __init__(self, video_file_path, output_folder, fps, parent=None):
+        super().__init__(parent)
+        self.video_file_path = video_file_path
+        self.output_folder = output_folder
+        self.fps = fps
+        self.stop_requested = False  # Set from the GUI thread, checked once per saved frame
+
+    def stop(self):
+        self.stop_requested = True
+
+    def run(self):
+        cap = cv2.VideoCapture(self.video_file_path)
+        video_fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frame_interval = max(1, int(round(video_fps / self.fps)))
+        self.total.emit(total_frames)
+
+        frame_count = 0
+        saved_frame_count = 0
+
+        # This thread decodes frames while a pool of writers encodes and saves them. At most
+        # max_pending decoded frames wait for a writer, which bounds memory use
+        max_pending = 8
+        pending = set()
+        with ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2)) as executor:
+            while not self.stop_requested:
+                # Decode the next kept frame and queue it for saving
+                success, frame = cap.read()
+                if not success:
+                    break
+                frame_filename = f"frame_{saved_frame_count:05d}.jpg"
+                frame_path = os.path.join(self.output_folder, frame_filename)
+                if len(pending) >= max_pending:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.add(executor.submit(cv2.imwrite, frame_path, frame))
+                saved_frame_count += 1
+                frame_count += 1
+
+                # Skip the frames in between. Long gaps seek straight to the next kept frame, which
+                # seeks from the nearest keyframe instead of demuxing every frame in between; depending
+                # on the codec the seek can land near rather than exactly on that frame. Short gaps,
+                # and backends that cannot seek, use grab(), which does not convert or copy the frames out
+                next_frame = frame_count + frame_interval - 1
+                if frame_interval >= self.seek_interval and cap.set(cv2.CAP_PROP_POS_MSEC, next_frame * 1000.0 / video_fps):
+                    frame_count = next_frame
+                else:
+                    for _ in range(frame_interval - 1):
+                        if not cap.grab():
+                            break
+                        frame_count += 1
+
+                self.progress.emit(frame_count)
+
+        cap.release()
+        self.finished_count.emit(saved_frame_count)
 
 class ExtractFramesDialog(QDialog):
     def __init__(self, parent=None):
@@ -1054,7 +1322,7 @@ class ExtractFramesDialog(QDialog):
         self.video_file_path = ''
         self.output_folder = ''
         self.fps = 1  # Default FPS
-        self.stop_requested = False  # Flag to handle stopping
+        self.worker = None  # Running ExtractWorker, if any
         self.initUI()
 
     def initUI(self):
@@ -1120,7 +1388,26 @@ class ExtractFramesDialog(QDialog):
             self.output_label.setText(folder_path)
 
     def stop_extraction(self):
-        self.stop_requested = True
+        if self.worker is not None:
+            self.worker.stop()
+
+    def stop_worker(self):
+        # Stop the worker and wait for its last frames, without reporting the result,
+        # when the dialog is dismissed while extracting
+        worker, self.worker = self.worker, None
+        if worker is not None:
+            worker.finished_count.disconnect(self.extraction_finished)
+            worker.stop()
+            worker.wait()
+
+    def done(self, result):
+        # Esc, the close button and close() all end the dialog here
+        self.stop_worker()
+        super().done(result)
+
+    def closeEvent(self, event):
+        self.stop_worker()
+        super().closeEvent(event)
 
     def extract_frames(self):
         # Validate inputs
@@ -1138,38 +1425,101 @@ class ExtractFramesDialog(QDialog):
             QMessageBox.warning(self, 'Error', 'Please enter a valid FPS value.')
             return
 
-        # Proceed to extract frames
-        cap = cv2.VideoCapture(self.video_file_path)
-        video_fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        frame_interval = int(round(video_fps / fps))
+        # Proceed to extract frames on a worker thread
+        self.progress_bar.setValue(0)
+        self.extract_button.setEnabled(False)
+        self.worker = ExtractWorker(self.video_file_path, self.output_folder, fps, self)
+        self.worker.total.connect(self.progress_bar.setMaximum)
+        self.worker.progress.connect(self.progress_bar.setValue)
+        self.worker.finished_count.connect(self.extraction_finished)
+        self.worker.start()
+
+    def extraction_finished(self, saved_frame_count):
+        worker = self.worker
+        if worker is None:
+            return  # The dialog was dismissed while the result was queued
+        worker.wait()
+        self.worker = None
+        self.extract_button.setEnabled(True)
+        if worker.stop_requested:
+            QMessageBox.information(self, 'Stopped', 'Frame extraction stopped.')
+        else:
+            QMessageBox.information(self, 'Success', f'Extracted {saved_frame_count} frames.')
+        self.close()
 
-        frame_count = 0
-        saved_frame_count = 0
-        success, frame = cap.read()
+class ResizeWorker(QThread):
+    """Resizes a list of images in place off the GUI thread and reports progress through signals."""
+    progress = pyqtSignal(int)  # Number of images processed so far
+    finished_count = pyqtSignal(int, int)  # Number of images resized and number skipped
 
-        self.progress_bar.setMaximum(total_frames)
-        self.stop_requested = False  # Reset stop flag
+    def __init__(self, image_files, width, height, keep_aspect_ratio, parent=None):
+        super().__init__(parent)
+        self.image_files = image_files
+        self.width = width
+        self.height = height
+        self.keep_aspect_ratio = keep_aspect_ratio
+        self.stop_requested = False  # Set from the GUI thread; images not started yet are skipped
 
-        while success and not self.stop_requested:
-            if frame_count % frame_interval == 0:
-                # Save frame as image
-                frame_filename = f"frame_{saved_frame_count:05d}.jpg"
-                frame_path = os.path.join(self.output_folder, frame_filename)
-                cv2.imwrite(frame_path, frame)
-                saved_frame_count += 1
+    def stop(self):
+        self.stop_requested = True
 
-            frame_count += 1
-            self.progress_bar.setValue(frame_count)
-            QApplication.processEvents()  # Keep the GUI responsive
-            success, frame = cap.read()
+    def target_size(self, w, h):
+        # Compute the target size per image so one image's aspect ratio does not leak into the next
+        target_width, target_height = self.width, self.height
+        if self.keep_aspect_ratio:
+            if w > h:
+                ratio = self.width / float(w)
+                target_height = int(h * ratio)
+            else:
+                ratio = self.height / float(h)
+                target_width = int(w * ratio)
+        return target_width, target_height
 
-        cap.release()
+    def resize_image(self, image_file):
+        """Resize one image in place; return False if it could not be read, resized or written."""
         if self.stop_requested:
-            QMessageBox.information(self, 'Stopped', 'Frame extraction stopped.')
-        else:
-            QMessageBox.information(self, 'Success', f'Extracted {saved_frame_count} frames.')
-        self.close()
+            return False
+        read_flags = cv2.IMREAD_COLOR
+        target = None
+        if JPEG_FILE_PATTERN.search(image_file):
+            # JPEGs can be decoded straight at half size; read the size from the header to decide,
+            # swapping it for EXIF rotations since cv2.imread applies the orientation
+            reader = QImageReader(image_file)
+            size = reader.size()
+            w, h = size.width(), size.height()
+            if reader.transformation() & QImageIOHandler.TransformationRotate90:
+                w, h = h, w
+            if w > 0 and h > 0:
+                target = self.target_size(w, h)
+                if 2 * target[0] <= w and 2 * target[1] <= h:
+                    read_flags = cv2.IMREAD_REDUCED_COLOR_2
+        image = cv2.imread(image_file, read_flags)
+        if image is None:
+            return False  # Unreadable or not an image; leave the file untouched
+        h, w = image.shape[:2]
+        if target is None:
+            target = self.target_size(w, h)
+        # Area averaging only pays off when shrinking; enlarging uses bilinear interpolation
+        interpolation = cv2.INTER_AREA if target[0] * target[1] < w * h else cv2.INTER_LINEAR
+        try:
+            resized_image = cv2.resize(image, target, interpolation=interpolation)
+            return cv2.imwrite(image_file, resized_image)
+        except (cv2.error, OSError):
+            return False
+
+    def run(self):
+        # OpenCV releases the GIL while decoding, resizing and encoding, so images are processed in parallel
+        resized_count = 0
+        try:
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                futures = [executor.submit(self.resize_image, image_file) for image_file in self.image_files]
+                for done_count, future in enumerate(as_completed(futures), 1):
+                    if future.result():
+                        resized_count += 1
+                    self.progress.emit(done_count)
+        finally:
+            # Always report back so the dialog is never left waiting with its button disabled
+            self.finished_count.emit(resized_count, len(self.image_files) - resized_count)
 
 class ResizeDialog(QDialog):
     def __init__(self, parent=None):
@@ -1178,6 +1528,7 @@ class ResizeDialog(QDialog):
         self.width = None
         self.height = None
         self.keep_aspect_ratio = False
+        self.worker = None  # Running ResizeWorker, if any
         self.initUI()
 
     def initUI(self):
@@ -1208,6 +1559,11 @@ class ResizeDialog(QDialog):
         self.select_folder_button.clicked.connect(self.select_image_folder)
         layout.addWidget(self.select_folder_button)
 
+        # Progress bar for resizing
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+
         # Resize button
         self.resize_button = QPushButton('Resize Images')
         self.resize_button.clicked.connect(self.resize_images)
@@ -1235,26 +1591,50 @@ class ResizeDialog(QDialog):
             QMessageBox.warning(self, 'Error', 'Please select an image folder.')
             return
 
-        supported_formats = ('.png', '.jpg', '.jpeg', '.bmp')
-        image_files = [os.path.join(self.image_folder, f)
-                       for f in os.listdir(self.image_folder)
-                       if f.lower().endswith(supported_formats)]
-
-        for image_file in image_files:
-            image = cv2.imread(image_file)
-            if keep_aspect_ratio:
-                h, w = image.shape[:2]
-                if w > h:
-                    ratio = width / float(w)
-                    height = int(h * ratio)
-                else:
-                    ratio = height / float(h)
-                    width = int(w * ratio)
-            resized_image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        with os.scandir(self.image_folder) as entries:
+            image_files = [entry.path for entry in entries
+                           if RESIZE_FILE_PATTERN.search(entry.name) and entry.is_file()]
 
-        QMessageBox.information(self, 'Success', f'Resized {len(image_files)} images.')
+        # Resize on a worker thread so the dialog stays responsive
+        self.progress_bar.setMaximum(len(image_files))
+        self.progress_bar.setValue(0)
+        self.resize_button.setEnabled(False)
+        self.worker = ResizeWorker(image_files, width, height, keep_aspect_ratio, self)
+        self.worker.progress.connect(self.progress_bar.setValue)
+        self.worker.finished_count.connect(self.resize_finished)
+        self.worker.start()
+
+    def resize_finished(self, resized_count, skipped_count):
+        worker, self.worker = self.worker, None
+        if worker is None:
+            return  # The dialog was dismissed while the result was queued
+        worker.wait()
+        self.resize_button.setEnabled(True)
+        if skipped_count:
+            QMessageBox.warning(self, 'Error', f'Resized {resized_count} images. '
+                                f'Skipped {skipped_count} images that could not be read or written.')
+        else:
+            QMessageBox.information(self, 'Success', f'Resized {resized_count} images.')
         self.close()
 
+    def stop_worker(self):
+        # Skip the images not started yet and let the ones being rewritten finish, without
+        # reporting the result, when the dialog is dismissed while resizing
+        worker, self.worker = self.worker, None
+        if worker is not None:
+            worker.finished_count.disconnect(self.resize_finished)
+            worker.stop()
+            worker.wait()
+
+    def done(self, result):
+        # Esc, the close button and close() all end the dialog here
+        self.stop_worker()
+        super().done(result)
+
+    def closeEvent(self, event):
+        self.stop_worker()
+        super().closeEvent(event)
+
 def main():
     app = QApplication(sys.argv)
     window = KeypointAnnotationTool()